@@ -1,78 +1,107 @@
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor
+from sklearn.ensemble import HistGradientBoostingRegressor
+from sklearn.inspection import permutation_importance
 from sklearn.model_selection import train_test_split
+from sklearn.compose import ColumnTransformer
+from sklearn.preprocessing import OrdinalEncoder
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 import psycopg2
+import os
+import sys
+import glob
+import hashlib
 import matplotlib.pyplot as plt
 # import seaborn as sns
 
+# Repo root on the path so shared analytics helpers import when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from analytics.sql_utils import read_sql_copy
+
 class PharmaDemandForecasting:
-    def __init__(self, db_config):
+    def __init__(self, db_config, cache_dir='data/cache'):
         self.db_config = db_config
+        self.cache_dir = cache_dir
+        self.categorical_cols = ['region', 'market_potential', 'category', 'performance_tier']
+        self.preprocessor = None
         self.model = None
         
     def extract_data_for_modeling(self):
         """Extract aggregated data for forecasting"""
-        query = """
-        SELECT 
-            d.year,
-            d.quarter,
-            d.month,
-            t.region,
-            t.market_potential,
-            p.category,
-            sr.performance_tier,
-            COUNT(DISTINCT fs.sale_id) as transaction_count,
-            SUM(fs.revenue) as total_revenue,
-            SUM(fs.quantity_sold) as total_quantity,
-            AVG(fs.discount_percent) as avg_discount,
-            SUM(fs.marketing_spend) as total_marketing,
-            COUNT(DISTINCT fs.doctor_key) as unique_doctors
-        FROM pharma.fact_sales fs
-        JOIN pharma.dim_date d ON fs.date_key = d.date_key
-        JOIN pharma.dim_territory t ON fs.territory_key = t.territory_key
-        JOIN pharma.dim_product p ON fs.product_key = p.product_key
-        JOIN pharma.dim_sales_rep sr ON fs.rep_key = sr.rep_key
-        GROUP BY d.year, d.quarter, d.month, t.region, t.market_potential, p.category, sr.performance_tier
+        # Aggregation lives in pharma.mv_forecast_features (db/create_tables.sql)
+        query = "SELECT * FROM pharma.mv_forecast_features"
+        
+        # The view's table statistics change whenever a refresh alters its rows
+        stats_query = """
+        SELECT pg_relation_filenode(relid), n_tup_ins, n_tup_del, last_analyze, last_autoanalyze
+        FROM pg_stat_all_tables
+        WHERE schemaname = 'pharma' AND relname = 'mv_forecast_features'
         """
         
         conn = psycopg2.connect(**self.db_config)
-        with psycopg2.connect(**self.db_config) as conn:
-            df = pd.read_sql(query, conn)
-        conn.close()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(stats_query)
+                stats = cur.fetchone()
+            
+            cache_key = hashlib.md5(repr(stats).encode()).hexdigest()
+            cache_path = os.path.join(self.cache_dir, f'mv_forecast_features_{cache_key}.parquet')
+            if os.path.exists(cache_path):
+                return pd.read_parquet(cache_path, engine='pyarrow')
+            
+            df = read_sql_copy(query, conn)
+        finally:
+            conn.close()
+        
+        # Drop caches from earlier refreshes before writing the current one
+        os.makedirs(self.cache_dir, exist_ok=True)
+        for stale_path in glob.glob(os.path.join(self.cache_dir, 'mv_forecast_features_*.parquet')):
+            os.remove(stale_path)
+        df.to_parquet(cache_path, engine='pyarrow', compression='zstd', index=False)
         
         return df
     
     def prepare_features(self, df):
         """Engineer features for modeling"""
-        # Create lag features
-        df_encoded = df.sort_values(['region', 'year', 'quarter', 'month'])
-        df_encoded['revenue_lag1'] = df_encoded.groupby(['region'])['total_revenue'].shift(1)
-        df_encoded['revenue_lag2'] = df_encoded.groupby(['region'])['total_revenue'].shift(2)
+        # Create lag features (before encoding, while region is still a plain column)
+        df_features = df.sort_values(['region', 'year', 'quarter', 'month'])
+        revenue_by_region = df_features.groupby('region', sort=False)['total_revenue']
+        df_features['revenue_lag1'] = revenue_by_region.shift(1)
+        df_features['revenue_lag2'] = revenue_by_region.shift(2)
 
         # Drop rows with NaN (from lag features)
-        df_encoded = df_encoded.dropna()
-
-        # Encode categorical variables
-        df_encoded = pd.get_dummies(df_encoded, columns=['region', 'market_potential', 'category', 'performance_tier'])
-        
+        df_features = df_features.dropna()
         
+        # Downcast numerics; tree splits don't need float64/int64 precision
+        float_cols = df_features.select_dtypes('float64').columns
+        df_features = df_features.astype({col: np.float32 for col in float_cols})
+        int_cols = df_features.select_dtypes('integer').columns
+        df_features[int_cols] = df_features[int_cols].apply(pd.to_numeric, downcast='integer')
         
-        
-        return df_encoded
+        return df_features
+    
+    def build_preprocessor(self, numeric_cols):
+        """Ordinal encode categoricals (leading columns), pass numerics through"""
+        return ColumnTransformer(
+            [('cat', OrdinalEncoder(handle_unknown='use_encoded_value', unknown_value=np.nan,
+                                    dtype=np.float32),
+              self.categorical_cols),
+             ('num', 'passthrough', numeric_cols)],
+            verbose_feature_names_out=False
+        )
     
     def train_model(self, df):
-        """Train Random Forest forecasting model"""
+        """Train histogram gradient boosting forecasting model"""
         # Prepare features
         df_model = self.prepare_features(df)
         
         # Define target and features
         target = 'total_revenue'
         exclude_cols = ['total_revenue', 'total_quantity', 'transaction_count']
-        features = [col for col in df_model.columns if col not in exclude_cols]
+        numeric_cols = [col for col in df_model.columns
+                        if col not in exclude_cols and col not in self.categorical_cols]
         
-        X = df_model[features]
+        X = df_model[self.categorical_cols + numeric_cols]
         y = df_model[target]
         
         # Split data
@@ -84,9 +113,17 @@ class PharmaDemandForecasting:
         y_train = y.iloc[:split_index]
         y_test = y.iloc[split_index:]
 
-        
-        # Train model
-        self.model = RandomForestRegressor(n_estimators=100, max_depth=10, random_state=42)
+        # Encode categoricals (fit on the training split only)
+        self.preprocessor = self.build_preprocessor(numeric_cols)
+        X_train = self.preprocessor.fit_transform(X_train)
+        X_test = self.preprocessor.transform(X_test)
+        features = self.preprocessor.get_feature_names_out()
+        
+        # Train model (categoricals are split natively on their ordinal codes)
+        self.model = HistGradientBoostingRegressor(
+            max_iter=200, max_depth=8, learning_rate=0.05, random_state=42,
+            categorical_features=list(range(len(self.categorical_cols)))
+        )
         self.model.fit(X_train, y_train)
         
         # Evaluate
@@ -102,10 +139,12 @@ class PharmaDemandForecasting:
         for metric, value in metrics.items():
             print(f"  {metric}: {value:,.2f}")
         
-        # Feature importance
+        # Feature importance (gradient boosting has no impurity importances)
+        importances = permutation_importance(self.model, X_test, y_test, n_repeats=5,
+                                             random_state=42, n_jobs=-1)
         feature_importance = pd.DataFrame({
-            'feature': features,
-            'importance': self.model.feature_importances_
+            'feature': pd.Categorical(features),
+            'importance': importances.importances_mean.astype(np.float32)
         }).sort_values('importance', ascending=False)
         
         print("\n🔝 Top 10 Important Features:")
@@ -117,7 +156,7 @@ class PharmaDemandForecasting:
         """Generate forecast for next quarter"""
         # This is a simplified example
         # In practice, you'd prepare the data properly with next quarter's features
-        prediction = self.model.predict(current_data)
+        prediction = self.model.predict(self.preprocessor.transform(current_data))
         return prediction
 
 # Run forecasting
@@ -0,0 +1,11 @@
+import pandas as pd
+import io
+
+def read_sql_copy(query, conn):
+    """Stream query results through COPY ... TO STDOUT into a DataFrame"""
+    buf = io.StringIO()
+    with conn.cursor() as cur:
+        cur.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT CSV, HEADER)", buf)
+    buf.seek(0)
+    # Only empty fields are NULL in COPY CSV output; keep strings like 'NA' or 'None' as-is
+    return pd.read_csv(buf, keep_default_na=False, na_values=[''])
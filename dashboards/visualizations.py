@@ -4,22 +4,49 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import psycopg2
 import sqlalchemy
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+# Repo root on the path so shared analytics helpers import when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from analytics.sql_utils import read_sql_copy
 
 class PharmaDashboard:
     def __init__(self, db_config):
         self.db_config = db_config
+        self.engine = sqlalchemy.create_engine(
+            f"postgresql+psycopg2://{db_config['user']}:{db_config['password']}@{db_config['host']}/{db_config['database']}",
+            pool_pre_ping=True,
+            pool_size=4
+        )
         
-    def get_data(self, query):
+    def get_data(self, query, statement_name=None):
         """Execute SQL query and return DataFrame"""
-        conn = psycopg2.connect(**self.db_config)
-        engine = sqlalchemy.create_engine(
-        f"postgresql://{self.db_config['user']}:{self.db_config['password']}@{self.db_config['host']}/{self.db_config['database']}"
-    )
-
-        df = pd.read_sql(query, engine)
-        conn.close()
+        # Borrow a pooled DBAPI connection; close() returns it to the pool
+        conn = self.engine.raw_connection()
+        try:
+            if statement_name is None:
+                df = read_sql_copy(query, conn)
+            else:
+                df = self.execute_prepared(conn, statement_name, query)
+        finally:
+            conn.close()
         return df
     
+    def execute_prepared(self, conn, statement_name, query):
+        """Run a server-side prepared statement, preparing it once per pooled connection"""
+        # conn.info lives as long as the underlying DBAPI connection (and its session)
+        prepared = conn.info.setdefault('prepared_statements', set())
+        with conn.cursor() as cur:
+            if statement_name not in prepared:
+                cur.execute(f"PREPARE {statement_name} AS {query}")
+                prepared.add(statement_name)
+            cur.execute(f"EXECUTE {statement_name}")
+            columns = [desc[0] for desc in cur.description]
+            rows = cur.fetchall()
+        return pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+    
     def create_rep_effectiveness_dashboard(self):
         """Dashboard 1: Sales Rep Effectiveness"""
         query = """
@@ -35,7 +62,7 @@ class PharmaDashboard:
         LIMIT 20
         """
         
-        df = self.get_data(query)
+        df = self.get_data(query, statement_name='rep_effectiveness')
         
         # Create subplot
         fig = make_subplots(
@@ -82,32 +109,20 @@ class PharmaDashboard:
         """Dashboard 2: Territory Performance Heatmap"""
         query = """
         SELECT 
-            territory_name,
-            region,
-            total_revenue,
-            market_potential,
-            revenue_per_1k_population
-        FROM (
-            SELECT 
-                t.territory_name,
-                t.region,
-                t.market_potential,
-                t.population,
-                SUM(fs.revenue) as total_revenue,
-                SUM(fs.revenue) / NULLIF(t.population, 0) * 1000 as revenue_per_1k_population
-            FROM pharma.fact_sales fs
-            JOIN pharma.dim_territory t ON fs.territory_key = t.territory_key
-            GROUP BY t.territory_name, t.region, t.market_potential, t.population
-        ) sub
+            t.territory_name,
+            t.region,
+            SUM(fs.revenue) as total_revenue
+        FROM pharma.fact_sales fs
+        JOIN pharma.dim_territory t ON fs.territory_key = t.territory_key
+        GROUP BY t.territory_name, t.region
         """
         
-        df = self.get_data(query)
+        df = self.get_data(query, statement_name='territory_heatmap')
         
-        # Create heatmap
-        pivot = df.pivot_table(values='total_revenue', 
-                               index='territory_name', 
-                               columns='region', 
-                               aggfunc='sum').fillna(0)
+        # Create heatmap (rows are already unique per territory/region)
+        pivot = df.pivot(index='territory_name', 
+                         columns='region', 
+                         values='total_revenue').fillna(0)
         
         fig = go.Figure(data=go.Heatmap(
             z=pivot.values,
@@ -151,12 +166,11 @@ class PharmaDashboard:
         ORDER BY year, quarter
         """
         
-        df = self.get_data(query)
+        df = self.get_data(query, statement_name='quarterly_trends')
         
         fig = go.Figure()
         
-        for region in df['region'].unique():
-            region_data = df[df['region'] == region]
+        for region, region_data in df.groupby('region', sort=False):
             fig.add_trace(go.Scatter(
                 x=region_data['period'],
                 y=region_data['quarterly_revenue'],
@@ -192,14 +206,18 @@ class PharmaInsightsGenerator:
     def __init__(self, db_config):
         self.db_config = db_config
     
+    def run_query(self, query):
+        """Execute SQL query on its own connection and return DataFrame"""
+        conn = psycopg2.connect(**self.db_config)
+        try:
+            return read_sql_copy(query, conn)
+        finally:
+            conn.close()
+    
     def generate_insights_report(self):
         """Generate comprehensive business insights"""
         
-        conn = psycopg2.connect(**self.db_config)
-        
-        insights = []
-        
-        # Insight 1: Underperforming high-potential territories
+        # Query 1: Underperforming high-potential territories
         query1 = """
         WITH territory_performance AS (
             SELECT 
@@ -217,17 +235,7 @@ class PharmaInsightsGenerator:
         WHERE market_potential = 'High' AND total_revenue < avg_revenue_by_potential * 0.7
         """
         
-        underperforming = pd.read_sql(query1, conn)
-        
-        if len(underperforming) > 0:
-            insights.append({
-                'category': 'Territory Optimization',
-                'finding': f'{len(underperforming)} high-potential territories are underperforming',
-                'recommendation': f'Reallocate top-performing reps to: {", ".join(underperforming["territory_name"].head(3).tolist())}',
-                'expected_impact': 'Potential 15-25% revenue increase in these territories'
-            })
-        
-        # Insight 2: Marketing spend efficiency
+        # Query 2: Marketing spend efficiency
         query2 = """
         SELECT 
             region,
@@ -240,19 +248,7 @@ class PharmaInsightsGenerator:
         ORDER BY roi DESC
         """
         
-        marketing_efficiency = pd.read_sql(query2, conn)
-        
-        best_roi_region = marketing_efficiency.iloc[0]['region']
-        worst_roi_region = marketing_efficiency.iloc[-1]['region']
-        
-        insights.append({
-            'category': 'Marketing ROI',
-            'finding': f'{best_roi_region} has highest ROI, {worst_roi_region} has lowest',
-            'recommendation': f'Reduce marketing spend in {worst_roi_region} by 20%, reinvest in {best_roi_region}',
-            'expected_impact': 'Projected 10% improvement in overall marketing efficiency'
-        })
-        
-        # Insight 3: Top product opportunities
+        # Query 3: Top product opportunities
         query3 = """
         SELECT 
             p.product_name,
@@ -267,8 +263,35 @@ class PharmaInsightsGenerator:
         LIMIT 5
         """
         
-        growth_products = pd.read_sql(query3, conn)
+        # Queries are independent, so run them concurrently on separate sessions
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            underperforming, marketing_efficiency, growth_products = executor.map(
+                self.run_query, [query1, query2, query3]
+            )
+        
+        insights = []
+        
+        # Insight 1: Underperforming high-potential territories
+        if len(underperforming) > 0:
+            insights.append({
+                'category': 'Territory Optimization',
+                'finding': f'{len(underperforming)} high-potential territories are underperforming',
+                'recommendation': f'Reallocate top-performing reps to: {", ".join(underperforming["territory_name"].head(3).tolist())}',
+                'expected_impact': 'Potential 15-25% revenue increase in these territories'
+            })
+        
+        # Insight 2: Marketing spend efficiency
+        best_roi_region = marketing_efficiency.iloc[0]['region']
+        worst_roi_region = marketing_efficiency.iloc[-1]['region']
         
+        insights.append({
+            'category': 'Marketing ROI',
+            'finding': f'{best_roi_region} has highest ROI, {worst_roi_region} has lowest',
+            'recommendation': f'Reduce marketing spend in {worst_roi_region} by 20%, reinvest in {best_roi_region}',
+            'expected_impact': 'Projected 10% improvement in overall marketing efficiency'
+        })
+        
+        # Insight 3: Top product opportunities
         insights.append({
             'category': 'Product Growth',
             'finding': f'Top revenue products have low prescriber penetration',
@@ -276,8 +299,6 @@ class PharmaInsightsGenerator:
             'expected_impact': 'Double prescriber count could add $2-5M in revenue'
         })
         
-        conn.close()
-        
         # Print report
         print("=" * 80)
         print("PHARMACEUTICAL SALES ANALYTICS - INSIGHTS REPORT")
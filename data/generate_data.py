@@ -1,11 +1,9 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import random
 
-# Set seed for reproducibility
-np.random.seed(42)
-random.seed(42)
+# Seeded generator for reproducibility
+rng = np.random.default_rng(42)
 
 # Configuration
 NUM_REPS = 50
@@ -39,11 +37,11 @@ def generate_dim_sales_rep():
     dim_sales_rep = pd.DataFrame({
         'rep_key': range(1, NUM_REPS + 1),
         'rep_name': [f'Rep_{i}' for i in range(1, NUM_REPS + 1)],
-        'region': np.random.choice(regions, NUM_REPS),
-        'team': np.random.choice(teams, NUM_REPS),
+        'region': rng.choice(regions, NUM_REPS),
+        'team': rng.choice(teams, NUM_REPS),
         'hire_date': pd.date_range(start='2018-01-01', periods=NUM_REPS, freq='15D'),
-        'experience_years': np.random.randint(1, 8, NUM_REPS),
-        'performance_tier': np.random.choice(['Top', 'Medium', 'Low'], NUM_REPS, p=[0.2, 0.6, 0.2])
+        'experience_years': rng.integers(1, 8, NUM_REPS),
+        'performance_tier': rng.choice(['Top', 'Medium', 'Low'], NUM_REPS, p=[0.2, 0.6, 0.2])
     })
     return dim_sales_rep
 
@@ -54,10 +52,10 @@ def generate_dim_doctor():
     dim_doctor = pd.DataFrame({
         'doctor_key': range(1, NUM_DOCTORS + 1),
         'doctor_name': [f'Dr_{i}' for i in range(1, NUM_DOCTORS + 1)],
-        'specialty': np.random.choice(specialties, NUM_DOCTORS),
-        'hospital': [f'Hospital_{np.random.randint(1, 51)}' for _ in range(NUM_DOCTORS)],
-        'city': [f'City_{np.random.randint(1, 101)}' for _ in range(NUM_DOCTORS)],
-        'prescription_volume': np.random.choice(['High', 'Medium', 'Low'], NUM_DOCTORS, p=[0.3, 0.5, 0.2])
+        'specialty': rng.choice(specialties, NUM_DOCTORS),
+        'hospital': np.char.add('Hospital_', rng.integers(1, 51, NUM_DOCTORS).astype(str)),
+        'city': np.char.add('City_', rng.integers(1, 101, NUM_DOCTORS).astype(str)),
+        'prescription_volume': rng.choice(['High', 'Medium', 'Low'], NUM_DOCTORS, p=[0.3, 0.5, 0.2])
     })
     return dim_doctor
 
@@ -68,10 +66,10 @@ def generate_dim_product():
     dim_product = pd.DataFrame({
         'product_key': range(1, NUM_PRODUCTS + 1),
         'product_name': [f'Drug_{chr(65+i)}' for i in range(NUM_PRODUCTS)],
-        'category': np.random.choice(categories, NUM_PRODUCTS),
-        'unit_price': np.random.uniform(50, 500, NUM_PRODUCTS).round(2),
+        'category': rng.choice(categories, NUM_PRODUCTS),
+        'unit_price': rng.uniform(50, 500, NUM_PRODUCTS).round(2),
         'launch_date': pd.date_range(start='2020-01-01', periods=NUM_PRODUCTS, freq='60D'),
-        'patent_status': np.random.choice(['Active', 'Expiring Soon'], NUM_PRODUCTS, p=[0.7, 0.3])
+        'patent_status': rng.choice(['Active', 'Expiring Soon'], NUM_PRODUCTS, p=[0.7, 0.3])
     })
     return dim_product
 
@@ -83,10 +81,10 @@ def generate_dim_territory():
     dim_territory = pd.DataFrame({
         'territory_key': range(1, NUM_TERRITORIES + 1),
         'territory_name': [f'Territory_{i}' for i in range(1, NUM_TERRITORIES + 1)],
-        'region': np.random.choice(regions, NUM_TERRITORIES),
-        'state': np.random.choice(states, NUM_TERRITORIES),
-        'population': np.random.randint(100000, 5000000, NUM_TERRITORIES),
-        'market_potential': np.random.choice(['High', 'Medium', 'Low'], NUM_TERRITORIES, p=[0.3, 0.5, 0.2])
+        'region': rng.choice(regions, NUM_TERRITORIES),
+        'state': rng.choice(states, NUM_TERRITORIES),
+        'population': rng.integers(100000, 5000000, NUM_TERRITORIES),
+        'market_potential': rng.choice(['High', 'Medium', 'Low'], NUM_TERRITORIES, p=[0.3, 0.5, 0.2])
     })
     return dim_territory
 
@@ -94,42 +92,60 @@ def generate_dim_territory():
 def generate_fact_sales(dim_date, dim_sales_rep, dim_doctor, dim_product, dim_territory):
     NUM_TRANSACTIONS = 50000
     
+    # Build each column as a typed array, then the DataFrame in one shot
+    sale_id = np.arange(1, NUM_TRANSACTIONS + 1, dtype=np.int32)
+    date_key = rng.choice(dim_date['date_key'].to_numpy(), NUM_TRANSACTIONS).astype(np.int32)
+    rep_key = rng.choice(dim_sales_rep['rep_key'].to_numpy(), NUM_TRANSACTIONS).astype(np.int32)
+    doctor_key = rng.choice(dim_doctor['doctor_key'].to_numpy(), NUM_TRANSACTIONS).astype(np.int32)
+    product_key = rng.choice(dim_product['product_key'].to_numpy(), NUM_TRANSACTIONS).astype(np.int32)
+    territory_key = rng.choice(dim_territory['territory_key'].to_numpy(), NUM_TRANSACTIONS).astype(np.int32)
+    quantity_sold = rng.integers(1, 100, NUM_TRANSACTIONS, dtype=np.int32)
+    discount_percent = rng.uniform(0, 15, NUM_TRANSACTIONS).round(2)
+    marketing_spend = rng.uniform(100, 5000, NUM_TRANSACTIONS).round(2)
+    
+    # Calculate revenue (product_key is dense 1..N, so look up unit_price by position)
+    unit_price = dim_product['unit_price'].to_numpy()[product_key - 1]
+    revenue = np.round(quantity_sold * unit_price * (1 - discount_percent/100), 2)
+    
     fact_sales = pd.DataFrame({
-        'sale_id': range(1, NUM_TRANSACTIONS + 1),
-        'date_key': np.random.choice(dim_date['date_key'], NUM_TRANSACTIONS),
-        'rep_key': np.random.choice(dim_sales_rep['rep_key'], NUM_TRANSACTIONS),
-        'doctor_key': np.random.choice(dim_doctor['doctor_key'], NUM_TRANSACTIONS),
-        'product_key': np.random.choice(dim_product['product_key'], NUM_TRANSACTIONS),
-        'territory_key': np.random.choice(dim_territory['territory_key'], NUM_TRANSACTIONS),
-        'quantity_sold': np.random.randint(1, 100, NUM_TRANSACTIONS),
-        'discount_percent': np.random.uniform(0, 15, NUM_TRANSACTIONS).round(2),
-        'marketing_spend': np.random.uniform(100, 5000, NUM_TRANSACTIONS).round(2)
+        'sale_id': sale_id,
+        'date_key': date_key,
+        'rep_key': rep_key,
+        'doctor_key': doctor_key,
+        'product_key': product_key,
+        'territory_key': territory_key,
+        'quantity_sold': quantity_sold,
+        'discount_percent': discount_percent,
+        'marketing_spend': marketing_spend,
+        'revenue': revenue
     })
     
-    # Calculate revenue (join with product to get unit_price)
-    fact_sales = fact_sales.merge(dim_product[['product_key', 'unit_price']], on='product_key')
-    fact_sales['revenue'] = (fact_sales['quantity_sold'] * fact_sales['unit_price'] * 
-                             (1 - fact_sales['discount_percent']/100)).round(2)
-    fact_sales = fact_sales.drop('unit_price', axis=1)
-    
     return fact_sales
 
-# Execute data generation
-print("Generating dimensional data...")
-dim_date = generate_dim_date()
-dim_sales_rep = generate_dim_sales_rep()
-dim_doctor = generate_dim_doctor()
-dim_product = generate_dim_product()
-dim_territory = generate_dim_territory()
-fact_sales = generate_fact_sales(dim_date, dim_sales_rep, dim_doctor, dim_product, dim_territory)
-
-# Save to CSV
-dim_date.to_csv('data/dim_date.csv', index=False)
-dim_sales_rep.to_csv('data/dim_sales_rep.csv', index=False)
-dim_doctor.to_csv('data/dim_doctor.csv', index=False)
-dim_product.to_csv('data/dim_product.csv', index=False)
-dim_territory.to_csv('data/dim_territory.csv', index=False)
-fact_sales.to_csv('data/fact_sales.csv', index=False)
+# Generate all tables (importable so the ETL can load them without files)
+def generate_all():
+    dim_date = generate_dim_date()
+    dim_sales_rep = generate_dim_sales_rep()
+    dim_doctor = generate_dim_doctor()
+    dim_product = generate_dim_product()
+    dim_territory = generate_dim_territory()
+    fact_sales = generate_fact_sales(dim_date, dim_sales_rep, dim_doctor, dim_product, dim_territory)
+    return dim_date, dim_sales_rep, dim_doctor, dim_product, dim_territory, fact_sales
 
-print("✅ Data generation complete!")
-print(f"Generated {len(fact_sales)} sales transactions")
\ No newline at end of file
+# Execute data generation
+if __name__ == "__main__":
+    print("Generating dimensional data...")
+    dim_date, dim_sales_rep, dim_doctor, dim_product, dim_territory, fact_sales = generate_all()
+    
+    # Save to Parquet
+    dim_date.to_parquet('data/dim_date.parquet', engine='pyarrow', compression='zstd', index=False)
+    dim_sales_rep.to_parquet('data/dim_sales_rep.parquet', engine='pyarrow', compression='zstd', index=False)
+    dim_doctor.to_parquet('data/dim_doctor.parquet', engine='pyarrow', compression='zstd', index=False)
+    dim_product.to_parquet('data/dim_product.parquet', engine='pyarrow', compression='zstd', index=False)
+    dim_territory.to_parquet('data/dim_territory.parquet', engine='pyarrow', compression='zstd', index=False)
+    # Small row groups give per-group sale_id statistics the incremental ETL can prune on
+    fact_sales.to_parquet('data/fact_sales.parquet', engine='pyarrow', compression='zstd', index=False,
+                          row_group_size=10_000)
+    
+    print("✅ Data generation complete!")
+    print(f"Generated {len(fact_sales)} sales transactions")
\ No newline at end of file
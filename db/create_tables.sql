@@ -72,4 +72,39 @@ CREATE TABLE IF NOT EXISTS pharma.fact_sales (
 CREATE INDEX IF NOT EXISTS idx_fact_date ON pharma.fact_sales(date_key);
 CREATE INDEX IF NOT EXISTS idx_fact_rep ON pharma.fact_sales(rep_key);
 CREATE INDEX IF NOT EXISTS idx_fact_territory ON pharma.fact_sales(territory_key);
-CREATE INDEX IF NOT EXISTS idx_fact_product ON pharma.fact_sales(product_key);
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS idx_fact_product ON pharma.fact_sales(product_key);
+
+-- Forecasting feature set (refreshed by the ETL after each fact load)
+CREATE MATERIALIZED VIEW IF NOT EXISTS pharma.mv_forecast_features AS
+SELECT 
+    d.year,
+    d.quarter,
+    d.month,
+    t.region,
+    t.market_potential,
+    p.category,
+    sr.performance_tier,
+    COUNT(DISTINCT fs.sale_id) as transaction_count,
+    SUM(fs.revenue) as total_revenue,
+    SUM(fs.quantity_sold) as total_quantity,
+    AVG(fs.discount_percent) as avg_discount,
+    SUM(fs.marketing_spend) as total_marketing,
+    COUNT(DISTINCT fs.doctor_key) as unique_doctors
+FROM pharma.fact_sales fs
+JOIN pharma.dim_date d 
+    ON fs.date_key = d.date_key
+JOIN pharma.dim_territory t 
+    ON fs.territory_key = t.territory_key
+JOIN pharma.dim_product p 
+    ON fs.product_key = p.product_key
+JOIN pharma.dim_sales_rep sr 
+    ON fs.rep_key = sr.rep_key
+GROUP BY d.year, d.quarter, d.month, t.region, 
+         t.market_potential, p.category, sr.performance_tier;
+
+-- Unique index is required for REFRESH MATERIALIZED VIEW CONCURRENTLY
+CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_forecast_features_key 
+    ON pharma.mv_forecast_features (year, quarter, month, region, 
+                                    market_potential, category, performance_tier);
+CREATE INDEX IF NOT EXISTS idx_mv_forecast_features_period 
+    ON pharma.mv_forecast_features (year, quarter);
@@ -1,6 +1,8 @@
 import pandas as pd
 import psycopg2
-from psycopg2.extras import execute_batch
+import io
+import os
+import sys
 from datetime import datetime
 import logging
 
@@ -33,93 +35,151 @@ class PharmaETL:
             self.conn.close()
         logger.info("Database connection closed")
     
-    def extract_csv(self, file_path):
-        """Extract data from CSV file"""
+    def source_path(self, table_name, data_dir='data'):
+        """Prefer generated Parquet for a table, falling back to the tracked CSV"""
+        parquet_path = os.path.join(data_dir, f'{table_name}.parquet')
+        if os.path.exists(parquet_path):
+            return parquet_path
+        return os.path.join(data_dir, f'{table_name}.csv')
+    
+    def extract_file(self, file_path):
+        """Extract data from Parquet or CSV file"""
         try:
-            df = pd.read_csv(file_path)
+            if file_path.endswith('.parquet'):
+                df = pd.read_parquet(file_path, engine='pyarrow')
+            else:
+                df = pd.read_csv(file_path)
             logger.info(f"✅ Extracted {len(df)} records from {file_path}")
             return df
         except Exception as e:
             logger.error(f"❌ Extraction failed for {file_path}: {e}")
             raise
     
+    def extract_new_facts(self, file_path, max_id, chunksize=100_000):
+        """Extract only fact records with sale_id greater than max_id"""
+        try:
+            if file_path.endswith('.parquet'):
+                # Row-group statistics let pyarrow skip data already loaded
+                df = pd.read_parquet(file_path, engine='pyarrow',
+                                     filters=[('sale_id', '>', max_id)])
+            else:
+                chunks = [chunk[chunk['sale_id'] > max_id]
+                          for chunk in pd.read_csv(file_path, chunksize=chunksize)]
+                df = pd.concat(chunks, ignore_index=True)
+            logger.info(f"✅ Extracted {len(df)} new records from {file_path}")
+            return df
+        except Exception as e:
+            logger.error(f"❌ Extraction failed for {file_path}: {e}")
+            raise
+    
+    def copy_records(self, df, table_name, ignore_conflicts=False):
+        """Bulk load a DataFrame into a table with COPY FROM STDIN"""
+        columns = ', '.join(df.columns)
+        buf = io.StringIO()
+        df.to_csv(buf, index=False, header=False)
+        buf.seek(0)
+        
+        if not ignore_conflicts:
+            self.cursor.copy_expert(f"COPY pharma.{table_name} ({columns}) FROM STDIN WITH (FORMAT CSV)", buf)
+            return
+        
+        # COPY has no ON CONFLICT clause, so stage rows in a temp table first
+        staging = f"tmp_{table_name}"
+        self.cursor.execute(
+            f"CREATE TEMP TABLE {staging} (LIKE pharma.{table_name} INCLUDING DEFAULTS) ON COMMIT DROP"
+        )
+        self.cursor.copy_expert(f"COPY {staging} ({columns}) FROM STDIN WITH (FORMAT CSV)", buf)
+        self.cursor.execute(
+            f"INSERT INTO pharma.{table_name} ({columns}) "
+            f"SELECT {columns} FROM {staging} ON CONFLICT DO NOTHING"
+        )
+    
     def load_dimension(self, df, table_name):
         """Load data into dimension table"""
         try:
-            # Convert DataFrame to list of tuples
-            records = [tuple(x) for x in df.to_numpy()]
-            
-            # Create INSERT query with column names
-            columns = ', '.join(df.columns)
-            placeholders = ', '.join(['%s'] * len(df.columns))
-            query = f"INSERT INTO pharma.{table_name} ({columns}) VALUES ({placeholders}) ON CONFLICT DO NOTHING"
-            
-            # Execute batch insert
-            execute_batch(self.cursor, query, records, page_size=1000)
+            self.copy_records(df, table_name, ignore_conflicts=True)
             self.conn.commit()
             
-            logger.info(f"✅ Loaded {len(records)} records into {table_name}")
+            logger.info(f"✅ Loaded {len(df)} records into {table_name}")
         except Exception as e:
             self.conn.rollback()
             logger.error(f"❌ Load failed for {table_name}: {e}")
             raise
     
-    def incremental_load_facts(self, df, table_name='fact_sales'):
-        """Incrementally load fact table (only new records)"""
+    def incremental_load_facts(self, source, table_name='fact_sales'):
+        """Incrementally load fact table (only new records) from a file path or DataFrame"""
         try:
             # Get max sale_id from database
             self.cursor.execute(f"SELECT COALESCE(MAX(sale_id), 0) FROM pharma.{table_name}")
             max_id = self.cursor.fetchone()[0]
             
-            # Filter only new records
-            new_records = df[df['sale_id'] > max_id]
+            # Keep only new records
+            if isinstance(source, pd.DataFrame):
+                new_records = source[source['sale_id'] > max_id]
+            else:
+                new_records = self.extract_new_facts(source, max_id)
             
             if len(new_records) == 0:
                 logger.info("No new records to load")
                 return
             
             # Load new records
-            records = [tuple(x) for x in new_records.to_numpy()]
-            columns = ', '.join(new_records.columns)
-            placeholders = ', '.join(['%s'] * len(new_records.columns))
-            query = f"INSERT INTO pharma.{table_name} ({columns}) VALUES ({placeholders})"
-            
-            execute_batch(self.cursor, query, records, page_size=1000)
+            self.copy_records(new_records, table_name)
             self.conn.commit()
             
-            logger.info(f"✅ Incrementally loaded {len(records)} new records into {table_name}")
+            logger.info(f"✅ Incrementally loaded {len(new_records)} new records into {table_name}")
         except Exception as e:
             self.conn.rollback()
             logger.error(f"❌ Incremental load failed: {e}")
             raise
     
-    def run_full_etl(self):
-        """Execute complete ETL pipeline"""
+    def refresh_materialized_views(self):
+        """Refresh materialized views that depend on the fact table"""
+        try:
+            self.cursor.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY pharma.mv_forecast_features")
+            self.conn.commit()
+            
+            logger.info("✅ Refreshed mv_forecast_features")
+        except Exception as e:
+            self.conn.rollback()
+            logger.error(f"❌ Materialized view refresh failed: {e}")
+            raise
+    
+    def run_full_etl(self, generate=False):
+        """Execute complete ETL pipeline (generate=True loads freshly generated tables without files)"""
         try:
             self.connect()
             
+            if generate:
+                # Only the in-memory path needs data/generate_data.py
+                sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data'))
+                from generate_data import generate_all
+                
+                logger.info("Generating tables in memory...")
+                dim_date, dim_sales_rep, dim_doctor, dim_product, dim_territory, fact_sales = generate_all()
+            else:
+                dim_date = self.extract_file(self.source_path('dim_date'))
+                dim_sales_rep = self.extract_file(self.source_path('dim_sales_rep'))
+                dim_doctor = self.extract_file(self.source_path('dim_doctor'))
+                dim_product = self.extract_file(self.source_path('dim_product'))
+                dim_territory = self.extract_file(self.source_path('dim_territory'))
+                fact_sales = self.source_path('fact_sales')
+            
             # Load dimensions
             logger.info("Loading dimension tables...")
-            dim_date = self.extract_csv('data/dim_date.csv')
             self.load_dimension(dim_date, 'dim_date')
-            
-            dim_sales_rep = self.extract_csv('data/dim_sales_rep.csv')
             self.load_dimension(dim_sales_rep, 'dim_sales_rep')
-            
-            dim_doctor = self.extract_csv('data/dim_doctor.csv')
             self.load_dimension(dim_doctor, 'dim_doctor')
-            
-            dim_product = self.extract_csv('data/dim_product.csv')
             self.load_dimension(dim_product, 'dim_product')
-            
-            dim_territory = self.extract_csv('data/dim_territory.csv')
             self.load_dimension(dim_territory, 'dim_territory')
             
             # Load facts (incremental)
             logger.info("Loading fact table...")
-            fact_sales = self.extract_csv('data/fact_sales.csv')
             self.incremental_load_facts(fact_sales)
             
+            logger.info("Refreshing materialized views...")
+            self.refresh_materialized_views()
+            
             logger.info("🎉 ETL pipeline completed successfully!")
             
         except Exception as e:
@@ -140,4 +200,4 @@ db_config = {
 # Run ETL
 if __name__ == "__main__":
     etl = PharmaETL(db_config)
-    etl.run_full_etl()
\ No newline at end of file
+    etl.run_full_etl(generate='--generate' in sys.argv)
\ No newline at end of file